@@ -26,5 +26,8 @@ setuptools.setup(
         "djangorestframework-simplejwt >= 4.4.0",
         "channels >= 3.0.3",
         "channels-redis >= 3.2.0"
-    ]
+    ],
+    extras_require={
+        "orjson": ["orjson >= 3.0.0"]
+    }
 )
@@ -1,5 +1,7 @@
+import sys
+
 from django_socket_framework.auth.event_lists import UserReturnEventListMixin
-from django_socket_framework.consumers import JsonMethodConsumer
+from django_socket_framework.consumers import JsonMethodConsumer, json_dumps
 
 
 class AuthConsumer(JsonMethodConsumer):
@@ -18,23 +20,55 @@ class AuthConsumer(JsonMethodConsumer):
             pass
         self.event_method_list = AuthEventList(self)
 
-    async def send_group_event(self, group_name, event_name, kwargs={}, args=[]):
-        """Adds initiator id to the kwargs"""
+    def add_initiator_id(self, kwargs=None):
+        """Returns a copy of the kwargs with initiator id added"""
+        kwargs = dict(kwargs) if kwargs else {}
         kwargs['__initiator_id'] = str(self.user.id) if self.authenticated else None
+        return kwargs
+
+    async def send_group_event(self, group_name, event_name, kwargs=None, args=None):
+        """Adds initiator id to the kwargs"""
         return await super(AuthConsumer, self).send_group_event(
-            group_name, event_name, kwargs, args
+            group_name, event_name, self.add_initiator_id(kwargs), args
         )
 
-    async def send_to_user(self, user_id, event_name, kwargs={}, args=[]):
+    async def send_channel_event(self, channel_name, event_name, kwargs=None, args=None):
+        """Adds initiator id to the kwargs"""
+        return await super(AuthConsumer, self).send_channel_event(
+            channel_name, event_name, self.add_initiator_id(kwargs), args
+        )
+
+    async def send_group_events(self, group_name, events):
+        """Adds initiator id to the kwargs of every event"""
+        return await super(AuthConsumer, self).send_group_events(group_name, [
+            (event_name, self.add_initiator_id(kwargs), args)
+            for event_name, kwargs, args in events
+        ])
+
+    async def send_to_user(self, user_id, event_name, kwargs=None, args=None):
         """Shorthand for send_group_event with user group"""
-        return await self.send_group_event(self.user_group_prefix + str(user_id), event_name, kwargs, args)
+        if self.authenticated and user_id == self.user.id:
+            group_name = self.user_group_name
+        else:
+            group_name = self.user_group_prefix + str(user_id)
+        return await self.send_group_event(group_name, event_name, kwargs, args)
 
-    async def user_return(self, kwargs={}, args=[]):
-        """Sends the data to all points where the authenticated user is logged from"""
+    async def user_return(self, kwargs=None, args=None):
+        """
+        Sends the data to all points where the authenticated user is logged from.
+        The data are encoded once here instead of once per receiving connection
+        """
+        kwargs = dict(kwargs) if kwargs else {}
+        if 'data' in kwargs:
+            kwargs['__encoded_data'] = json_dumps(kwargs.pop('data'))
         await self.send_group_event(self.user_group_name, 'user_return__', kwargs, args)
 
     async def authenticate(self, user):
         self.user = user
-        self.user_group_name = self.user_group_prefix + str(user.id)
+        self.user_group_name = sys.intern(self.user_group_prefix + str(user.id))
         self.authenticated = True
+        self.api_middlewares = tuple(
+            middleware for middleware in self.api_middlewares
+            if not getattr(getattr(middleware, 'middleware_class', None), 'skip_when_authenticated', False)
+        )
         await self.attach_group(self.user_group_name)
@@ -7,7 +7,11 @@ class UserReturnEventListMixin(BaseConsumerMethodList):
     async def user_return__(self, data=None, *args, **kwargs):
         """Just send given data to the user"""
         try:
-            await self.consumer.send_json(data)
+            encoded_data = kwargs.get('__encoded_data')
+            if encoded_data is not None:
+                await self.consumer.send_json(encoded=encoded_data)
+            else:
+                await self.consumer.send_json(data)
         except KeyError as e:
             await self.consumer.send_error(_("No data for the user_return."))
 
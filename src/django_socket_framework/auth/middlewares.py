@@ -1,3 +1,8 @@
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+
 from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
@@ -8,8 +13,13 @@ from django_socket_framework.middlewares import ConsumerMiddleware
 
 __all__ = ['BaseTokenAuthMiddleware', 'JWTAuthMiddleware']
 
+NO_TOKEN_MESSAGE = _("There is no access token.")
+AUTHORIZATION_FAILED_MESSAGE = _("Authorization failed.")
+
 
 class BaseTokenAuthMiddleware(ConsumerMiddleware):
+    skip_when_authenticated = True
+
     async def get_user_by_token(self, token):
         """Performs token checking and returns it's owner"""
         pass
@@ -21,21 +31,72 @@ class BaseTokenAuthMiddleware(ConsumerMiddleware):
 
         token = data.get('access_token')
         if not token:
-            raise ConsumerAuthorizationError(_("There is no access token."))
+            raise ConsumerAuthorizationError(NO_TOKEN_MESSAGE)
         user = await self.get_user_by_token(token)
         
         if not user:
-            raise ConsumerAuthorizationError(_("Authorization failed."))
+            raise ConsumerAuthorizationError(AUTHORIZATION_FAILED_MESSAGE)
         await consumer.authenticate(user)
 
         return data
 
 
 class JWTAuthMiddleware(BaseTokenAuthMiddleware):
+    """
+    Keeps a per-process LRU cache of token owners, so reconnecting with
+    the same token skips both the signature check and the DB query.
+    Every connection gets its own copy of the cached user.
+    user_cache_ttl - the longest time (in seconds) a user is kept,
+        the token's own expiration time is never exceeded
+    user_cache_size - 0 turns the cache off
+    """
+    user_cache_ttl: int = 300
+    user_cache_size: int = 10000
+
+    _user_cache: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def get_token_key(token):
+        return hashlib.blake2b(str(token).encode(), digest_size=16).digest()
+
+    def get_cached_user(self, key):
+        cache = self._user_cache
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            cache.pop(key, None)
+            return None
+        cache.move_to_end(key)
+        return copy.deepcopy(user)
+
+    def cache_user(self, key, user, token_exp):
+        now = time.time()
+        expires_at = min(now + self.user_cache_ttl, token_exp)
+        if expires_at <= now:
+            return
+        cache = self._user_cache
+        cache[key] = (copy.deepcopy(user), expires_at)
+        cache.move_to_end(key)
+        while len(cache) > self.user_cache_size:
+            cache.popitem(last=False)
+
     async def get_user_by_token(self, token):
         """Performs token checking and returns it's owner"""
+        key = None
+        if self.user_cache_size > 0:
+            key = self.get_token_key(token)
+            user = self.get_cached_user(key)
+            if user is not None:
+                return user
+
         try:
             token = AccessToken(token)
-            return await sync_to_async(get_user_model().objects.get)(id=token['user_id'])
+            user = await sync_to_async(get_user_model().objects.get)(id=token['user_id'])
         except Exception as e:
             return None
+
+        if key is not None:
+            self.cache_user(key, user, token['exp'])
+        return user
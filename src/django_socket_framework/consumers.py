@@ -1,6 +1,9 @@
 import asyncio
 import json
+import logging
+import re
 from collections.abc import Sequence
+from types import MappingProxyType
 
 from channels.consumer import AsyncConsumer
 from channels.exceptions import DenyConnection, StopConsumer
@@ -11,13 +14,37 @@ from django_socket_framework.types import (
     ClientEventType,
     ErrorType,
     BaseConsumerError,
-    ClientEvent,
     ConsumerSystemError,
     ConsumerTypeError
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Unlike json.dumps, orjson rejects integers beyond 64 bits
+    # and encodes NaN/Infinity as null
+    def json_dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    json_loads = orjson.loads
+else:
+    json_dumps = json.dumps
+    json_loads = json.loads
+
 __all__ = ['BaseConsumer', 'JsonConsumer', 'JsonMethodConsumer']
 
+logger = logging.getLogger(__name__)
+
+# Matches the start of a JSON-object without copying the frame
+JSON_OBJECT_START = re.compile(r'[ \t\r\n]*\{')
+
+# Read-only defaults for method/event calls without args or kwargs
+EMPTY_ARGS = ()
+EMPTY_KWARGS = MappingProxyType({})
+
 
 class BaseConsumer(AsyncConsumer):
     """
@@ -26,7 +53,28 @@ class BaseConsumer(AsyncConsumer):
     """
 
     base_groups: Sequence = []
-    active_groups: set = set()
+    active_groups: set = None
+
+    # Frames of a type without a handler are dropped without awaiting the no-op stub
+    _has_text_handler: bool = False
+    _has_bytes_handler: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._has_text_handler = cls.receive_text is not BaseConsumer.receive_text
+        cls._has_bytes_handler = cls.receive_bytes is not BaseConsumer.receive_bytes
+
+    def __init__(self, *args, **kwargs):
+        self.active_groups = set()
+
+    def get_active_groups(self) -> set:
+        """
+        Returns the set of active groups, creating it if needed,
+        so subclasses that don't call super().__init__() keep working
+        """
+        if self.active_groups is None:
+            self.active_groups = set()
+        return self.active_groups
 
     async def attach_group(self, group_name: str) -> bool:
         """
@@ -35,8 +83,9 @@ class BaseConsumer(AsyncConsumer):
             True - group has been added
             False - group are already presented in the list
         """
-        if group_name not in self.active_groups:
-            self.active_groups.add(group_name)
+        active_groups = self.get_active_groups()
+        if group_name not in active_groups:
+            active_groups.add(group_name)
             await self.channel_layer.group_add(group_name, self.channel_name)
             return True
         return False
@@ -48,8 +97,9 @@ class BaseConsumer(AsyncConsumer):
             True - group has been removed
             False - group are already not in the list
         """
-        if group_name in self.active_groups:
-            self.active_groups.remove(group_name)
+        active_groups = self.get_active_groups()
+        if group_name in active_groups:
+            active_groups.remove(group_name)
             await self.channel_layer.group_discard(group_name, self.channel_name)
             return True
         return False
@@ -58,23 +108,37 @@ class BaseConsumer(AsyncConsumer):
         """
         Detaches all the groups from the layer
         """
-        fs = [
-            self.detach_group(group)
-            for group in set(self.active_groups)
-        ]
-        if fs:
-            await asyncio.wait(fs)
+        groups, self.active_groups = self.get_active_groups(), set()
+        if not groups:
+            return
+        group_discard, channel_name = self.channel_layer.group_discard, self.channel_name
+        await self._gather([
+            group_discard(group, channel_name)
+            for group in groups
+        ])
 
     async def init_base_groups(self):
         """
         Activates all groups from base_groups
         """
-        fs = [
-            self.attach_group(group)
-            for group in self.base_groups
-        ]
-        if fs:
-            await asyncio.wait(fs)
+        active_groups = self.get_active_groups()
+        groups = set(self.base_groups) - active_groups
+        if not groups:
+            return
+        active_groups |= groups
+        group_add, channel_name = self.channel_layer.group_add, self.channel_name
+        await self._gather([
+            group_add(group, channel_name)
+            for group in groups
+        ])
+
+    @staticmethod
+    async def _gather(fs):
+        """Awaits the coroutines, skipping the gather overhead for a single one"""
+        if len(fs) == 1:
+            await fs[0]
+        elif fs:
+            await asyncio.gather(*fs)
 
     async def websocket_connect(self, message):
         """
@@ -101,8 +165,9 @@ class BaseConsumer(AsyncConsumer):
         to receive().
         """
         if "text" in message:
-            await self.receive_text(message["text"])
-        else:
+            if self._has_text_handler:
+                await self.receive_text(message["text"])
+        elif self._has_bytes_handler:
             await self.receive_bytes(message["bytes"])
 
     async def receive_text(self, data=None):
@@ -152,30 +217,148 @@ class BaseConsumer(AsyncConsumer):
 
 
 class JsonConsumer(BaseConsumer):
-    async def send_json(self, data=None):
-        """Sends the data as JSON"""
-        return await self.send_text(json.dumps(data))
+    """
+    batch_frames - coalesces JSON messages queued during one loop tick
+        into a single frame. Every frame is then a JSON array of messages,
+        even if there is only one of them. Raw text/bytes frames and close
+        go through the same queue, so the sending order is kept
+    """
+    batch_frames: bool = False
+    # Rejects frames that are not JSON objects before parsing them
+    json_object_only: bool = False
+
+    _out_queue: asyncio.Queue = None
+    _out_task: asyncio.Future = None
+
+    # Pre-serialized ClientEvent of ERROR type for errors without extra parameters
+    error_template: str = (
+        '{"type":"%s","data":{"detail":%%s,"type":%%s,"__echo_client_data":%%s}}'
+        % ClientEventType.ERROR.value
+    )
+    # The same envelope with the whole data object encoded at once
+    error_data_template: str = '{"type":"%s","data":%%s}' % ClientEventType.ERROR.value
+
+    async def websocket_connect(self, message):
+        if self.batch_frames:
+            self._out_queue = asyncio.Queue()
+            self._out_task = asyncio.ensure_future(self.drain_out_queue())
+        await super(JsonConsumer, self).websocket_connect(message)
+
+    async def websocket_disconnect(self, message):
+        try:
+            await super(JsonConsumer, self).websocket_disconnect(message)
+        finally:
+            if self._out_task is not None:
+                self._out_task.cancel()
+                self._out_task = None
+            self._out_queue = None
+
+    async def drain_out_queue(self):
+        """
+        Sends everything gathered in the queue on each wake-up.
+        Queued JSON texts (str) between other frames (dict) are joined
+        into a single array frame
+        """
+        queue = self._out_queue
+        send = super(BaseConsumer, self).send
+        while True:
+            items = [await queue.get()]
+            while not queue.empty():
+                items.append(queue.get_nowait())
+
+            frames, batch = [], []
+            for item in items:
+                if isinstance(item, str):
+                    batch.append(item)
+                    continue
+                if batch:
+                    frames.append({"type": "websocket.send", "text": '[' + ','.join(batch) + ']'})
+                    batch = []
+                frames.append(item)
+            if batch:
+                frames.append({"type": "websocket.send", "text": '[' + ','.join(batch) + ']'})
+
+            try:
+                for frame in frames:
+                    try:
+                        await send(frame)
+                    except Exception as e:
+                        logger.error("Failed to send batched frame: %r", e, exc_info=e)
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    async def send_text(self, data):
+        if self._out_queue is not None:
+            return self._out_queue.put_nowait({"type": "websocket.send", "text": data})
+        await super(JsonConsumer, self).send_text(data)
+
+    async def send_bytes(self, data):
+        if self._out_queue is not None:
+            return self._out_queue.put_nowait({"type": "websocket.send", "bytes": data})
+        await super(JsonConsumer, self).send_bytes(data)
+
+    async def close(self, code=None):
+        """Closes the WebSocket after all the queued frames are sent"""
+        queue = self._out_queue
+        if queue is None:
+            return await super(JsonConsumer, self).close(code)
+        if code is not None and code is not True:
+            queue.put_nowait({"type": "websocket.close", "code": code})
+        else:
+            queue.put_nowait({"type": "websocket.close"})
+        await queue.join()
+
+    async def send_json(self, data=None, encoded=None):
+        """
+        Sends the data as JSON
+        encoded - the data already encoded as JSON text, it's sent as is
+        """
+        if encoded is None:
+            encoded = json_dumps(data)
+        if self._out_queue is not None:
+            return self._out_queue.put_nowait(encoded)
+        return await self.send_text(encoded)
 
     async def send_error(self, text=None, error_type=ErrorType.SYSTEM_ERROR, error=None):
         """Sends standard error messages of ERROR type"""
         additions = {}
-        if error:
+        if isinstance(error, BaseConsumerError):
+            text = str(error)
+            error_type = error.error_type
+            additions = error.addition_parameters
+        elif error:
             text = str(error)
             error_type = getattr(error, 'error_type', ErrorType.SYSTEM_ERROR)
             additions = getattr(error, 'addition_parameters', {})
-
-        return await self.send_json(ClientEvent(
-            ClientEventType.ERROR,
-            detail=text,
-            type=error_type,
-            **additions
-        ))
+        elif text is not None:
+            # Lazy translation strings are not JSON serializable
+            text = str(text)
+
+        if additions.keys() <= {'__echo_client_data'}:
+            return await self.send_json(encoded=self.error_template % (
+                json_dumps(text),
+                json_dumps(error_type),
+                json_dumps(additions.get('__echo_client_data')),
+            ))
+        return await self.send_json(encoded=self.error_data_template % json_dumps({
+            '__echo_client_data': None,
+            **additions,
+            'detail': text,
+            'type': error_type,
+        }))
 
     async def handle_error(self, error, *args, **kwargs):
         """This method decides what to do with errors"""
         if isinstance(error, BaseConsumerError):
             error.addition_parameters.update(kwargs)
         else:
+            if isinstance(error, TypeError):
+                # Mostly arguments sent by the client that don't fit the method,
+                # so no traceback to keep bad clients from flooding the log
+                logger.warning("Consumer type error: %r", error)
+            else:
+                logger.error("Unhandled consumer error: %r", error, exc_info=error)
             error = ConsumerSystemError(
                 str(error) if getattr(settings, "DEBUG", False) else "Internal Server Error",
                 **kwargs
@@ -184,8 +367,11 @@ class JsonConsumer(BaseConsumer):
 
     async def receive_text(self, text=None):
         """Tries to login the user and then calls methods"""
+        if self.json_object_only and isinstance(text, str) and not JSON_OBJECT_START.match(text):
+            return await self.handle_error(ConsumerTypeError("The data have to be a JSON-object."))
+
         try:
-            await self.receive_json(json.loads(text))
+            await self.receive_json(json_loads(text))
         except Exception as e:
             await self.handle_error(BaseConsumerError(
                 "The data are not of JSON type.", ErrorType.TYPE_ERROR
@@ -196,6 +382,17 @@ class JsonConsumer(BaseConsumer):
 
 
 class JsonMethodConsumer(JsonConsumer):
+    """
+    coalesce_group_events - identical group events sent during one loop tick
+        are sent to the layer only once, at the end of the tick. Each event
+        keeps the position of its last send, so A, B, A goes out as B, A
+    """
+    json_object_only = True
+    coalesce_group_events: bool = False
+
+    _pending_group_events: dict = None
+    _group_events_flush: asyncio.Future = None
+
     api_method_list_class: BaseConsumerMethodList = BaseConsumerMethodList
     api_method_list: BaseConsumerMethodList = None
 
@@ -206,6 +403,7 @@ class JsonMethodConsumer(JsonConsumer):
     event_middlewares = tuple()
 
     def __init__(self, *args, **kwargs):
+        super(JsonMethodConsumer, self).__init__(*args, **kwargs)
         self.init_api_method_list()
         self.init_event_method_list()
 
@@ -215,27 +413,100 @@ class JsonMethodConsumer(JsonConsumer):
     def init_event_method_list(self):
         self.event_method_list = self.event_method_list_class(self)
 
-    async def send_group_event(self, group_name, event_name, kwargs={}, args=[]):
+    async def send_group_event(self, group_name, event_name, kwargs=None, args=None):
         """Sends event call to the group"""
+        message = {
+            'type': 'receive_event',
+            'event_name': event_name,
+            'args': args or [],
+            'kwargs': kwargs or {}
+        }
+        if not self.coalesce_group_events:
+            return await self.channel_layer.group_send(group_name, message)
+
+        try:
+            key = (group_name, event_name, json_dumps(message['args']), json_dumps(message['kwargs']))
+        except TypeError:
+            return await self.channel_layer.group_send(group_name, message)
+
+        pending = self._pending_group_events
+        if pending is None:
+            pending = self._pending_group_events = {}
+            asyncio.get_running_loop().call_soon(self.flush_group_events)
+        pending.pop(key, None)
+        pending[key] = (group_name, message)
+
+    def flush_group_events(self):
+        """Sends all the pending group events in one background task"""
+        pending, self._pending_group_events = self._pending_group_events, None
+        if not pending:
+            return
+        self._group_events_flush = asyncio.ensure_future(
+            self._send_pending_group_events(list(pending.values()), self._group_events_flush)
+        )
+        self._group_events_flush.add_done_callback(self._group_events_flushed)
+
+    async def _send_pending_group_events(self, events, previous_flush=None):
+        # Events are sent one by one and after the previous flush,
+        # so the layer gets them in the order they were sent
+        if previous_flush is not None:
+            await asyncio.wait((previous_flush,))
+        group_send = self.channel_layer.group_send
+        for group_name, message in events:
+            try:
+                await group_send(group_name, message)
+            except Exception as e:
+                logger.error("Failed to send group event: %r", e, exc_info=e)
+
+    def _group_events_flushed(self, future):
+        if future is self._group_events_flush:
+            self._group_events_flush = None
+
+    async def send_channel_event(self, channel_name, event_name, kwargs=None, args=None):
+        """Sends event call straight to a single channel, bypassing the groups"""
+        return await self.channel_layer.send(
+            channel_name, {
+                'type': 'receive_event',
+                'event_name': event_name,
+                'args': args or [],
+                'kwargs': kwargs or {}
+            }
+        )
+
+    async def send_to_self(self, event_name, kwargs=None, args=None):
+        """Sends event call to this connection only"""
+        return await self.send_channel_event(self.channel_name, event_name, kwargs, args)
+
+    async def send_group_events(self, group_name, events):
+        """
+        Sends several event calls to the group with a single layer message
+        events - iterable of (event_name, kwargs, args) tuples
+        """
         return await self.channel_layer.group_send(
             group_name, {
                 'type': 'receive_event',
-                'event_name': event_name,
-                'args': args,
-                'kwargs': kwargs
+                'events': [
+                    {'event_name': event_name, 'args': args or [], 'kwargs': kwargs or {}}
+                    for event_name, kwargs, args in events
+                ]
             }
         )
 
+    @staticmethod
+    def get_echo_client_data(data):
+        """Safely takes __echo_client_data from the kwargs of possibly malformed data"""
+        kwargs = data.get("kwargs") if isinstance(data, dict) else None
+        return kwargs.get("__echo_client_data") if isinstance(kwargs, dict) else None
+
     async def receive_json(self, data=None):
         try:
-            if type(data) != dict:
-                data = {}
+            if data.__class__ is not dict:
                 raise ConsumerTypeError("The data have to be a JSON-object.")
             await self.call_method(data)
         except Exception as e:
             await self.handle_error(
                 error=e,
-                __echo_client_data=(data or {}).get("kwargs", {}).get("__echo_client_data")
+                __echo_client_data=self.get_echo_client_data(data)
             )
 
     async def call_method(self, data):
@@ -245,25 +516,33 @@ class JsonMethodConsumer(JsonConsumer):
         for middleware in self.api_middlewares:
             data = await middleware(self, data)
 
+        data_get = data.get
         res = await self.api_method_list.__call_method__(
-            data.get('method'), data.get("kwargs", {}), data.get("args", [])
+            data_get('method'), data_get("kwargs", EMPTY_KWARGS), data_get("args", EMPTY_ARGS)
         )
         if res is not None:
             await self.send_json(res)
 
     async def receive_event(self, data):
-        try:
-            await self.call_event(data)
-        except Exception as e:
-            await self.handle_error(
-                error=e,
-                __echo_client_data=(data or {}).get("kwargs", {}).get("__echo_client_data")
-            )
+        events = data.get('events')
+        if events is None:
+            events = (data,)
+
+        call_event, handle_error = self.call_event, self.handle_error
+        for event in events:
+            try:
+                await call_event(event)
+            except Exception as e:
+                await handle_error(
+                    error=e,
+                    __echo_client_data=self.get_echo_client_data(event)
+                )
 
     async def call_event(self, event):
         for middleware in self.event_middlewares:
             event = await middleware(self, event)
 
+        event_get = event.get
         await self.event_method_list.__call_method__(
-            event.get('event_name'), event.get('kwargs', {}), event.get('args', [])
+            event_get('event_name'), event_get('kwargs', EMPTY_KWARGS), event_get('args', EMPTY_ARGS)
         )
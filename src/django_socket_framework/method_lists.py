@@ -1,4 +1,6 @@
-from django_socket_framework.types import ErrorType, BaseConsumerError
+from collections.abc import Mapping
+
+from django_socket_framework.types import ErrorType, BaseConsumerError, ConsumerTypeError
 
 
 class BaseConsumerMethodList:
@@ -15,10 +17,14 @@ class BaseConsumerMethodList:
                 and not attr_name.startswith('__'))
         }
 
-    async def __call_method__(self, method_name, kwargs: dict = {}, args: list = []):
+    async def __call_method__(self, method_name, kwargs: dict = None, args: list = None):
         if method_name not in self.allowed_methods:
             raise BaseConsumerError(
                 f'You do not have permissions to execute this method ({method_name})',
                 ErrorType.ACCESS_ERROR
             )
-        return await getattr(self, method_name)(*args, **kwargs)
+        if args is not None and not isinstance(args, (list, tuple)):
+            raise ConsumerTypeError("The args have to be a JSON-array.")
+        if kwargs is not None and not isinstance(kwargs, Mapping):
+            raise ConsumerTypeError("The kwargs have to be a JSON-object.")
+        return await getattr(self, method_name)(*(args or ()), **(kwargs or {}))
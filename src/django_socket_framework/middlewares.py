@@ -1,7 +1,15 @@
 class ConsumerMiddleware:
+    """
+    skip_when_authenticated - the middleware does nothing for authenticated
+        consumers, so it can be dropped from their middleware list
+    """
+    skip_when_authenticated: bool = False
+
     @classmethod
     def as_function(cls):
-        return lambda *args, **kwargs: cls().handle(*args, **kwargs)
+        function = lambda *args, **kwargs: cls().handle(*args, **kwargs)
+        function.middleware_class = cls
+        return function
 
     async def handle(self, *args, **kwargs):
         pass
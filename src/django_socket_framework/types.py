@@ -25,8 +25,8 @@ class ClientEvent(dict):
         super(ClientEvent, self).__init__({
             'type': __event_type,
             'data': {
-                **kwargs,
-                '__echo_client_data': __echo_client_data
+                '__echo_client_data': __echo_client_data,
+                **kwargs
             }
         })
 